@@ -0,0 +1,94 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from recipes.cache import bump_version, get_cache, get_version, is_shared
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+def token_cache_key(key):
+    '''Tokens are secrets, so the shared cache only sees their digest.'''
+    return f'auth:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+class LocalUserCache:
+    '''
+    Process-local LRU of token owners. Entries expire after the timeout
+    and when the 'auth' version changes, which happens whenever any
+    token is deleted or user changed, in any process sharing the cache.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is None:
+                return None
+            user, entry_version, expires = entry
+            if entry_version != version or expires < time.monotonic():
+                del self._users[key]
+                return None
+            self._users.move_to_end(key)
+            return user
+
+    def set(self, key, user, version):
+        with self._lock:
+            self._users[key] = (
+                user, version, time.monotonic() + settings.AUTH_CACHE_TIMEOUT
+            )
+            self._users.move_to_end(key)
+            while len(self._users) > settings.AUTH_LOCAL_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+
+local_users = LocalUserCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''
+    TokenAuthentication that resolves token owners from the local
+    cache, then the shared cache, and only then from the database.
+    With per-process caches a revoked token would stay valid in other
+    processes, so the owners are then always read from the database.
+    '''
+
+    def authenticate_credentials(self, key):
+        if not (is_shared(caches[settings.AUTH_CACHE])
+                and is_shared(get_cache())):
+            return super().authenticate_credentials(key)
+        version = get_version('auth')
+        user = local_users.get(key, version)
+        if user is None:
+            cache = caches[settings.AUTH_CACHE]
+            user = cache.get(token_cache_key(key))
+            if user is None:
+                try:
+                    user = Token.objects.select_related(
+                        'user'
+                    ).get(key=key).user
+                except Token.DoesNotExist:
+                    raise AuthenticationFailed(_('Invalid token.'))
+                cache.set(
+                    token_cache_key(key), user, settings.AUTH_CACHE_TIMEOUT
+                )
+            local_users.set(key, user, version)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        # Requests may change their user, so they get a copy of their own.
+        user = copy.copy(user)
+        return user, Token(key=key, user=user)
+
+
+def forget_tokens(keys):
+    caches[settings.AUTH_CACHE].delete_many(map(token_cache_key, keys))
+    bump_version('auth')
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, register
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    '''
+    Cached data and its invalidation must reach every worker process,
+    which a process-local cache does not do.
+    '''
+    if settings.GUNICORN_WORKERS <= 1:
+        return []
+    return [
+        Error(
+            f'The {alias!r} cache is local to one process, but '
+            f'{settings.GUNICORN_WORKERS} gunicorn workers are configured.',
+            hint=(
+                'Set CACHE_BACKEND and CACHE_LOCATION to a shared cache '
+                'such as memcached, or GUNICORN_WORKERS to 1.'
+            ),
+            id='api.E001',
+        )
+        for alias in settings.CACHES
+        if isinstance(caches[alias], LocMemCache)
+    ]
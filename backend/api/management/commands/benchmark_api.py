@@ -0,0 +1,140 @@
+import json
+import random
+from itertools import cycle
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe, ShoppingCart
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+PERCENTILES = (50, 95, 99)
+INGREDIENT_PREFIXES = ('а', 'мо', 'сах', 'кур', 'сыр', 'ябл', 'то')
+
+
+def percentile(values, rank):
+    '''Nearest-rank percentile of sorted values.'''
+    position = max(0, -(-len(values) * rank // 100) - 1)
+    return values[position]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the main API endpoints through the test client and report '
+        'latency percentiles and queries per request. Run seed_synthetic '
+        'first; save results with --output and pass them to --compare on '
+        'another commit.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--user', help='Username to authenticate as.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='')
+        parser.add_argument('--output', help='Write results as JSON.')
+        parser.add_argument('--compare', help='JSON results to compare to.')
+
+    def get_user(self, username):
+        if username:
+            return User.objects.get(username=username)
+        cart = ShoppingCart.objects.filter(
+            user__follower__isnull=False
+        ).order_by('user_id').first()
+        if cart is None:
+            raise CommandError(
+                'No user with a shopping cart and subscriptions, '
+                'run seed_synthetic or pass --user.'
+            )
+        return cart.user
+
+    def endpoints(self):
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        random.shuffle(recipe_ids)
+        recipes = cycle(recipe_ids)
+        prefixes = cycle(INGREDIENT_PREFIXES)
+        return {
+            'recipes': lambda: '/api/recipes/',
+            'recipe': lambda: f'/api/recipes/{next(recipes)}/',
+            'subscriptions': lambda: '/api/users/subscriptions/',
+            'shopping_cart': lambda: '/api/recipes/download_shopping_cart/',
+            'ingredients': lambda: f'/api/ingredients/?name={next(prefixes)}',
+        }
+
+    def request(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            start = perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = perf_counter() - start
+        if response.status_code != 200:
+            raise CommandError(f'GET {url}: {response.status_code}')
+        return elapsed, len(queries)
+
+    def measure(self, client, url, count):
+        timings, queries = [], []
+        for _ in range(count):
+            elapsed, query_count = self.request(client, url())
+            timings.append(elapsed * 1000)
+            queries.append(query_count)
+        timings.sort()
+        result = {
+            f'p{rank}_ms': round(percentile(timings, rank), 3)
+            for rank in PERCENTILES
+        }
+        result['mean_ms'] = round(sum(timings) / count, 3)
+        result['queries'] = round(sum(queries) / count, 2)
+        result['max_queries'] = max(queries)
+        return result
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+        results = {
+            'label': options['label'],
+            'database': connection.vendor,
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'requests': options['requests'],
+            'endpoints': {},
+        }
+        for name, url in self.endpoints().items():
+            for _ in range(options['warmup']):
+                self.request(client, url())
+            results['endpoints'][name] = self.measure(
+                client, url, options['requests']
+            )
+        baseline = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                baseline = json.load(file)['endpoints']
+        self.report(results, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2)
+
+    def report(self, results, baseline):
+        self.stdout.write(
+            f'{results["users"]} users, {results["recipes"]} recipes, '
+            f'{results["database"]}, {results["requests"]} requests each'
+        )
+        self.stdout.write(
+            f'{"endpoint":>14} {"p50, ms":>9} {"p95, ms":>9} {"p99, ms":>9}'
+            f' {"queries":>8}' + (f' {"p95 change":>11}' if baseline else '')
+        )
+        for name, result in results['endpoints'].items():
+            line = (
+                f'{name:>14} {result["p50_ms"]:>9.2f}'
+                f' {result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f}'
+                f' {result["queries"]:>8.2f}'
+            )
+            if name in baseline:
+                change = result['p95_ms'] / baseline[name]['p95_ms'] - 1
+                line += f' {change:>+11.1%}'
+            self.stdout.write(line)
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from recipes.models import Recipe
+
+MODES = {
+    'new connection': {'CONN_MAX_AGE': 0},
+    'persistent': {'CONN_MAX_AGE': 60},
+    'pool': {'CONN_MAX_AGE': 0, 'ENGINE': 'backend.postgresql_pool'},
+}
+
+
+def percentile(values, rank):
+    return values[max(0, -(-len(values) * rank // 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare request latency on Postgres with a new connection per '
+        'request, persistent connections and the connection pool, with '
+        'concurrent threads doing what a request does: open or reuse '
+        'the connection, run a query and close or keep it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--pool-size', type=int, default=4)
+
+    def add_alias(self, mode, overrides, pool_size):
+        alias = f'benchmark_{mode.replace(" ", "_")}'
+        settings_dict = {
+            **connections.databases['default'],
+            **overrides,
+            'POOL': {'SIZE': pool_size, 'TIMEOUT': 30},
+        }
+        connections.databases[alias] = settings_dict
+        return alias
+
+    def request(self, alias):
+        '''One request: the connection handling Django does around it.'''
+        start = perf_counter()
+        db = connections[alias]
+        db.close_if_unusable_or_obsolete()
+        list(Recipe.objects.using(alias).order_by('-pub_date')[:6])
+        db.close_if_unusable_or_obsolete()
+        return perf_counter() - start
+
+    def worker(self, alias, count):
+        try:
+            return [self.request(alias) for _ in range(count)]
+        finally:
+            connections[alias].close()
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The benchmark needs a Postgres database.')
+        threads = options['threads']
+        self.stdout.write(
+            f'{threads} threads, {options["requests"]} requests each, '
+            f'pool of {options["pool_size"]}'
+        )
+        self.stdout.write(
+            f'{"mode":>15} {"p50, ms":>9} {"p95, ms":>9} {"requests/s":>11}'
+        )
+        for mode, overrides in MODES.items():
+            alias = self.add_alias(mode, overrides, options['pool_size'])
+            start = perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = executor.map(
+                    self.worker, [alias] * threads,
+                    [options['requests']] * threads,
+                )
+                timings = sorted(
+                    timing for result in results for timing in result
+                )
+            elapsed = perf_counter() - start
+            self.stdout.write(
+                f'{mode:>15} {percentile(timings, 50) * 1000:>9.2f}'
+                f' {percentile(timings, 95) * 1000:>9.2f}'
+                f' {len(timings) / elapsed:>11.0f}'
+            )
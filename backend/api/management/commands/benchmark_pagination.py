@@ -0,0 +1,50 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare latency of deep recipe list pages '
+        'in page number and cursor pagination modes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=50)
+        parser.add_argument('--report-every', type=int, default=10)
+
+    def page_number_timings(self, client, pages):
+        for page in range(1, pages + 1):
+            start = perf_counter()
+            response = client.get('/api/recipes/', {'page': page})
+            elapsed = perf_counter() - start
+            if response.status_code != 200:
+                return
+            yield elapsed
+
+    def cursor_timings(self, client, pages):
+        url = '/api/recipes/?pagination=cursor'
+        for _ in range(pages):
+            start = perf_counter()
+            response = client.get(url)
+            elapsed = perf_counter() - start
+            yield elapsed
+            url = response.json()['next']
+            if url is None:
+                return
+
+    def handle(self, *args, **options):
+        client = Client()
+        pages = options['pages']
+        report_every = options['report_every']
+        timings = zip(
+            self.page_number_timings(client, pages),
+            self.cursor_timings(client, pages),
+        )
+        self.stdout.write(f'{"page":>6} {"number, ms":>12} {"cursor, ms":>12}')
+        for page, (number, cursor) in enumerate(timings, start=1):
+            if page == 1 or page % report_every == 0:
+                self.stdout.write(
+                    f'{page:>6} {number * 1000:>12.2f} {cursor * 1000:>12.2f}'
+                )
@@ -0,0 +1,54 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from recipes.models import Recipe
+from recipes.search import search_recipes, uses_postgres
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare recipe search backed by full-text search (or the '
+        'in-memory index) with icontains lookups on the current database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queries',
+            nargs='*',
+            default=['суп', 'курица', 'сыр', 'шоколад'],
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def measure(self, search):
+        start = perf_counter()
+        for _ in range(self.repeat):
+            count = search().count()
+        return (perf_counter() - start) / self.repeat, count
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        backend = 'tsvector' if uses_postgres() else 'inverted index'
+        self.stdout.write(
+            f'{Recipe.objects.count()} recipes, search backend: {backend}'
+        )
+        self.stdout.write(
+            f'{"query":>12} {"icontains, ms":>14} {"found":>7}'
+            f' {"search, ms":>11} {"found":>7}'
+        )
+        for query in options['queries']:
+            icontains_time, icontains_count = self.measure(
+                lambda: Recipe.objects.filter(
+                    Q(name__icontains=query)
+                    | Q(text__icontains=query)
+                    | Q(ingredients__name__icontains=query)
+                ).distinct()
+            )
+            search_time, search_count = self.measure(
+                lambda: search_recipes(Recipe.objects.all(), query)
+            )
+            self.stdout.write(
+                f'{query:>12} {icontains_time * 1000:>14.2f}'
+                f' {icontains_count:>7} {search_time * 1000:>11.2f}'
+                f' {search_count:>7}'
+            )
@@ -0,0 +1,152 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+_current = ContextVar('request_metrics', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class QueryBudgetExceededError(Exception):
+    pass
+
+
+class RequestMetrics:
+    '''
+    Query count, DB and serializer time and recipe card cache hits of
+    the current request.
+    '''
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+        self.card_hits = 0
+        self.card_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        '''Database execute wrapper timing every query.'''
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += perf_counter() - start
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def current_metrics():
+    return _current.get()
+
+
+@contextmanager
+def serializer_timer():
+    '''Add the outermost serialization time to the request metrics.'''
+    metrics = current_metrics()
+    if metrics is None or metrics.serializing:
+        yield
+        return
+    metrics.serializing = True
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializing = False
+        metrics.serializer_time += perf_counter() - start
+
+
+class TimedSerializerMixin:
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class ViewStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_time = 0
+        self.serializer_time = 0
+        self.card_hits = 0
+        self.card_misses = 0
+        self.latency = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class MetricsRegistry:
+    '''Per-process totals by view name, rendered for Prometheus.'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(ViewStats)
+
+    def observe(self, view_name, metrics, latency):
+        with self._lock:
+            stats = self._views[view_name]
+            stats.requests += 1
+            stats.queries += metrics.queries
+            stats.db_time += metrics.db_time
+            stats.serializer_time += metrics.serializer_time
+            stats.card_hits += metrics.card_hits
+            stats.card_misses += metrics.card_misses
+            stats.latency += latency
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.buckets[position] += 1
+
+    def render(self):
+        with self._lock:
+            views = sorted(self._views.items())
+            lines = [
+                '# HELP foodgram_request_duration_seconds Request latency.',
+                '# TYPE foodgram_request_duration_seconds histogram',
+            ]
+            for view, stats in views:
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(
+                        'foodgram_request_duration_seconds_bucket'
+                        f'{{view="{view}",le="{bound}"}} {count}'
+                    )
+                lines.extend((
+                    'foodgram_request_duration_seconds_bucket'
+                    f'{{view="{view}",le="+Inf"}} {stats.requests}',
+                    'foodgram_request_duration_seconds_sum'
+                    f'{{view="{view}"}} {stats.latency}',
+                    'foodgram_request_duration_seconds_count'
+                    f'{{view="{view}"}} {stats.requests}',
+                ))
+            for name, help_text, attribute in (
+                ('foodgram_db_queries_total',
+                 'Database queries.', 'queries'),
+                ('foodgram_db_duration_seconds_total',
+                 'Time spent in database queries.', 'db_time'),
+                ('foodgram_serializer_duration_seconds_total',
+                 'Time spent in serializers.', 'serializer_time'),
+                ('foodgram_recipe_card_cache_hits_total',
+                 'Recipe cards served from the cache.', 'card_hits'),
+                ('foodgram_recipe_card_cache_misses_total',
+                 'Recipe cards built and cached.', 'card_misses'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for view, stats in views:
+                    lines.append(
+                        f'{name}{{view="{view}"}} {getattr(stats, attribute)}'
+                    )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,71 @@
+import logging
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import (QueryBudgetExceededError, finish_request, registry,
+                      start_request)
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsMiddleware:
+    '''
+    Record query count, DB time, serializer time and latency of every
+    request by resolved view name, report them in the Server-Timing
+    header and check them against QUERY_BUDGETS.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def measure(self, metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    def __call__(self, request):
+        metrics, token = start_request()
+        start = perf_counter()
+        try:
+            with self.measure(metrics):
+                response = self.get_response(request)
+        finally:
+            finish_request(token)
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db_time * 1000:.2f};'
+            f'desc="{metrics.queries} queries", '
+            f'serializer;dur={metrics.serializer_time * 1000:.2f}, '
+            f'total;dur={(perf_counter() - start) * 1000:.2f}'
+        )
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response.streaming_content, metrics, start
+            )
+        else:
+            self.finish(request, metrics, start)
+        return response
+
+    def stream(self, request, content, metrics, start):
+        '''Keep counting queries that run while the response streams.'''
+        with self.measure(metrics):
+            yield from content
+        self.finish(request, metrics, start)
+
+    def finish(self, request, metrics, start):
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        registry.observe(view_name, metrics, perf_counter() - start)
+        budget = settings.QUERY_BUDGETS.get(f'{request.method} {view_name}')
+        if budget is None or metrics.queries <= budget:
+            return
+        message = (
+            f'{request.method} {view_name} ran {metrics.queries} queries, '
+            f'the budget is {budget}.'
+        )
+        if settings.QUERY_BUDGET_ACTION == 'raise':
+            raise QueryBudgetExceededError(message)
+        logger.warning(message)
@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+from .authentication import forget_tokens
+
+
+def forget_on_commit(keys):
+    '''
+    Forget after commit too, or a concurrent request could cache
+    the old row again before the change is visible.
+    '''
+    forget_tokens(keys)
+    transaction.on_commit(lambda: forget_tokens(keys))
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(instance, **kwargs):
+    forget_on_commit((instance.key,))
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(instance, created, update_fields, **kwargs):
+    # Every login saves last_login, which cached owners do not depend on.
+    if not created and set(update_fields or ()) != {'last_login'}:
+        forget_on_commit(list(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        ))
+
+
+@receiver(request_started)
+def check_idle_connections(**kwargs):
+    '''
+    Close persistent connections the server may have dropped while
+    they were idle, so the request opens a new one instead of failing.
+    '''
+    now = time.monotonic()
+    for connection in connections.all():
+        started_at = getattr(connection, 'request_started_at', now)
+        connection.request_started_at = now
+        if (connection.connection is not None
+                and now - started_at > settings.DB_HEALTH_CHECK_INTERVAL
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,321 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from recipes.models import (Favorites, Follow, Ingredient, Recipe,
+                            RecipeAndIngredient, ShoppingCart, Tag)
+from recipes.relations import load_relations
+from recipes.scores import trending_score
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from users.models import User
+
+from .v1.renderers import FastJSONRenderer
+from .v1.serializers import RecipeSerializer, represent_recipes
+
+
+class APITestCase(TestCase):
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='secret',
+            first_name='Cook', last_name='Cook',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f'ingredient {number}', measurement_unit='g'
+            )
+            for number in range(3)
+        ]
+
+    def create_recipes(self, count, author=None):
+        recipes = []
+        for number in range(count):
+            recipe = Recipe.objects.create(
+                author=author or self.user, name=f'recipe {number}',
+                text='text', cooking_time=10,
+            )
+            RecipeAndIngredient.objects.bulk_create(
+                RecipeAndIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=number + 1
+                )
+                for ingredient in self.ingredients
+            )
+            recipes.append(recipe)
+        return recipes
+
+    def download(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+
+class ShoppingCartDownloadTest(APITestCase):
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        for count in (1, 10):
+            with self.subTest(recipes=count):
+                ShoppingCart.objects.all().delete()
+                ShoppingCart.objects.bulk_create(
+                    ShoppingCart(user=self.user, recipe=recipe)
+                    for recipe in self.create_recipes(count)
+                )
+                for file_format in ('txt', 'csv'):
+                    with self.assertNumQueries(1):
+                        self.download(
+                            '/api/recipes/download_shopping_cart/'
+                            f'?format={file_format}'
+                        )
+
+
+class RepresentRecipesTest(APITestCase):
+    '''represent_recipes must render exactly as RecipeSerializer does.'''
+
+    def setUp(self):
+        super().setUp()
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='secret', first_name='Author', last_name='Author',
+        )
+        tag = Tag.objects.create(name='tag', slug='tag', color='#FF0000')
+        recipes = self.create_recipes(2) + self.create_recipes(2, author)
+        for recipe in recipes:
+            recipe.tags.set((tag,))
+        Recipe.objects.filter(id=recipes[0].id).update(
+            image='recipes/images/first.png', image_variants_ready=True
+        )
+        Recipe.objects.filter(id=recipes[2].id).update(
+            image='recipes/images/third.png'
+        )
+        Favorites.objects.create(user=self.user, recipe=recipes[1])
+        ShoppingCart.objects.create(user=self.user, recipe=recipes[2])
+        Follow.objects.create(user=self.user, author=author)
+
+    def request(self, user):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        return request
+
+    def test_matches_serializer(self):
+        for user in (AnonymousUser(), self.user):
+            expected = JSONRenderer().render(RecipeSerializer(
+                Recipe.objects.with_relations(), many=True,
+                context={'request': self.request(user)},
+            ).data)
+            # The second pass renders the recipe cards cached by the first.
+            for cached in (False, True):
+                with self.subTest(user=user, cached=cached):
+                    self.assertEqual(
+                        FastJSONRenderer().render(represent_recipes(
+                            Recipe.objects.all(),
+                            {'request': self.request(user)},
+                        )),
+                        expected,
+                    )
+
+
+class RelationsCacheTest(APITestCase):
+
+    def test_subscribe_with_cached_relations(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='secret', first_name='Author', last_name='Author',
+        )
+        self.assertEqual(load_relations(self.user)['subscribe'], set())
+        response = self.client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['is_subscribed'])
+
+
+class SearchTest(APITestCase):
+    '''Search data follows recipes and ingredients saved outside the API.'''
+
+    def search(self, query):
+        response = self.client.get(f'/api/recipes/?search={query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_follows_changes(self):
+        recipe, = self.create_recipes(1)
+        recipe.name = 'pancakes'
+        recipe.save()
+        self.assertEqual(self.search('pancake'), [recipe.id])
+        ingredient = self.ingredients[0]
+        ingredient.name = 'buckwheat'
+        ingredient.save()
+        self.assertEqual(self.search('buckwheat'), [recipe.id])
+
+
+class ContentVersionTest(APITestCase):
+    '''Amounts and tags changed without saving the recipe expire its card.'''
+
+    def setUp(self):
+        super().setUp()
+        self.recipe, = self.create_recipes(1)
+        self.tag = Tag.objects.create(name='tag', slug='tag', color='#FF0000')
+
+    def assert_changes_content(self, change):
+        before = self.recipe.content_updated_at
+        change()
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.content_updated_at, before)
+
+    def test_changes(self):
+        amount = self.recipe.ingredients_with_amount_set.first()
+        for name, change in (
+            ('delete amount', lambda: RecipeAndIngredient.objects.get(
+                id=amount.id
+            ).delete()),
+            ('create amount', lambda: RecipeAndIngredient.objects.create(
+                recipe=self.recipe, ingredient=amount.ingredient, amount=5
+            )),
+            ('add tag', lambda: self.recipe.tags.add(self.tag)),
+            ('remove from tag', lambda: self.tag.recipes.remove(self.recipe)),
+            ('set tags', lambda: self.recipe.tags.set((self.tag,))),
+            ('clear tag', lambda: self.tag.recipes.clear()),
+        ):
+            with self.subTest(change=name):
+                self.assert_changes_content(change)
+
+
+class ConditionalListTest(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        for recipe in self.create_recipes(3):
+            Favorites.objects.create(user=self.user, recipe=recipe)
+
+    def test_recipe_leaving_filtered_list(self):
+        url = '/api/recipes/?is_favorited=1'
+        response = self.client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        recipe_id = response.data['results'][0]['id']
+        self.client.delete(f'/api/recipes/{recipe_id}/favorite/')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+
+    def test_cursor_page_without_count(self):
+        url = '/api/recipes/?pagination=cursor'
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in queries.captured_queries
+        ))
+
+
+class TrendingScoreTest(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe, = self.create_recipes(1)
+        self.url = f'/api/recipes/{self.recipe.id}/favorite/'
+
+    def score(self):
+        self.recipe.score.refresh_from_db()
+        return self.recipe.score
+
+    @override_settings(TRENDING_HALF_LIFE=timedelta(hours=1))
+    def test_short_half_life(self):
+        self.assertEqual(self.client.post(self.url).status_code, 201)
+        self.assertAlmostEqual(
+            self.score().trending,
+            trending_score(1, Favorites.objects.get().added_at),
+        )
+
+    def test_removal_takes_back_its_weight(self):
+        reader = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            password='secret', first_name='Reader', last_name='Reader',
+        )
+        Favorites.objects.create(
+            user=reader, recipe=self.recipe,
+            added_at=timezone.now() - timedelta(days=365),
+        )
+        self.assertEqual(self.client.post(self.url).status_code, 201)
+        Favorites.objects.get(user=reader).delete()
+        self.assertAlmostEqual(
+            self.score().trending,
+            trending_score(
+                1, Favorites.objects.get(user=self.user).added_at
+            ),
+        )
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertEqual(
+            (self.score().popular, self.score().trending), (0, 0.0)
+        )
+
+
+@override_settings(QUERY_BUDGET_ACTION='raise')
+class QueryBudgetTest(APITestCase):
+    '''
+    Requests are made with a token and cold caches, as the first
+    request of a client is, so exceeding QUERY_BUDGETS fails them.
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            password='secret', first_name='Author', last_name='Author',
+        )
+        tags = [
+            Tag.objects.create(
+                name=f'tag {number}', slug=f'tag{number}',
+                color=f'#00000{number}'
+            )
+            for number in range(2)
+        ]
+        recipes = self.create_recipes(8, author=self.author)
+        for recipe in recipes:
+            recipe.tags.set(tags)
+        Follow.objects.create(user=self.user, author=self.author)
+        for model in (Favorites, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=self.user, recipe=recipe)
+                for recipe in recipes[:4]
+            )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def get(self, url, client=None):
+        for cache in caches.all():
+            cache.clear()
+        response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            b''.join(response.streaming_content)
+
+    def test_recipe_list(self):
+        for url in (
+            '/api/recipes/',
+            '/api/recipes/?is_favorited=1&is_in_shopping_cart=1',
+            f'/api/recipes/?tags=tag0&tags=tag1&author={self.author.id}',
+            '/api/recipes/?search=recipe',
+            '/api/recipes/?ordering=popular',
+        ):
+            with self.subTest(url=url):
+                self.get(url)
+                self.get(url, APIClient())
+
+    def test_subscriptions(self):
+        self.get('/api/users/subscriptions/')
+        self.get('/api/users/subscriptions/?recipes_limit=2')
+
+    def test_shopping_cart_download(self):
+        self.get('/api/recipes/download_shopping_cart/')
+        self.get('/api/recipes/download_shopping_cart/?format=csv')
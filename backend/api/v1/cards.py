@@ -0,0 +1,67 @@
+import json
+
+from api.metrics import current_metrics
+from django.conf import settings
+from django.core.cache import caches
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode(card):
+    if orjson is not None:
+        return orjson.dumps(card)
+    return json.dumps(card, ensure_ascii=False, separators=(',', ':'))
+
+
+def decode(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def card_key(recipe, base_url):
+    '''
+    Cards are versioned by Recipe.content_updated_at, which changes with
+    the recipe, its tags, ingredients and author, but not with favorites
+    or follows. Image URLs are absolute, so the key includes the host
+    they were built for.
+    '''
+    return (
+        f'recipe_card:{recipe.id}:'
+        f'{recipe.content_updated_at.timestamp():.6f}:{base_url}'
+    )
+
+
+def get_cards(recipes, request, build, load):
+    '''
+    User-independent parts of the recipes' representation by id, from
+    the cache where present. `load` fetches relations of the missing
+    recipes and `build` makes their cards.
+    '''
+    cache = caches[settings.RECIPE_CARD_CACHE]
+    base_url = request.build_absolute_uri('/')
+    keys = {card_key(recipe, base_url): recipe for recipe in recipes}
+    cards = {
+        keys[key].id: decode(data)
+        for key, data in cache.get_many(keys).items()
+    }
+    missing = {
+        key: recipe for key, recipe in keys.items() if recipe.id not in cards
+    }
+    if missing:
+        load(list(missing.values()))
+        built = {key: build(recipe) for key, recipe in missing.items()}
+        cache.set_many(
+            {key: encode(card) for key, card in built.items()},
+            settings.RECIPE_CARD_CACHE_TIMEOUT,
+        )
+        for key, card in built.items():
+            cards[missing[key].id] = card
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.card_hits += len(keys) - len(missing)
+        metrics.card_misses += len(missing)
+    return cards
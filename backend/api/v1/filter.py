@@ -1,31 +1,70 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Favorites, Recipe, ShoppingCart, Tag
+from recipes.search import search_recipes
 
 BOOLEAN_CHOICES = ((0, 'False'), (1, 'True'),)
 
 
-class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(
-        field_name='name',
-        lookup_expr='istartswith'
-    )
-
-    class Meta:
-        model = Ingredient
-        fields = ['name']
-
-
 class RecipeFilter(filters.FilterSet):
+    '''
+    Relation predicates are composed as EXISTS subqueries, so matching
+    several tags or combining flags never duplicates recipe rows.
+    '''
 
     tags = filters.ModelMultipleChoiceFilter(
         field_name='tags__slug',
         to_field_name='slug',
         queryset=Tag.objects.all(),
+        method='filter_tags',
+    )
+    is_favorited = filters.TypedChoiceFilter(
+        choices=BOOLEAN_CHOICES,
+        coerce=int,
+        method='filter_is_favorited',
     )
+    is_in_shopping_cart = filters.TypedChoiceFilter(
+        choices=BOOLEAN_CHOICES,
+        coerce=int,
+        method='filter_is_in_shopping_cart',
+    )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
         fields = [
             'author',
             'tags',
+            'is_favorited',
+            'is_in_shopping_cart',
+            'search',
         ]
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.annotate(has_tags=Exists(
+            Recipe.tags.through.objects.filter(
+                recipe=OuterRef('pk'),
+                tag__in=value,
+            )
+        )).filter(has_tags=True)
+
+    def filter_related(self, queryset, related_model, name, value):
+        user = self.request.user
+        if not value or not user.is_authenticated:
+            return queryset
+        return queryset.annotate(**{name: Exists(
+            related_model.objects.filter(user=user, recipe=OuterRef('pk'))
+        )}).filter(**{name: True})
+
+    def filter_is_favorited(self, queryset, name, value):
+        return self.filter_related(queryset, Favorites, 'in_favorites', value)
+
+    def filter_is_in_shopping_cart(self, queryset, name, value):
+        return self.filter_related(
+            queryset, ShoppingCart, 'in_shopping_cart', value
+        )
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
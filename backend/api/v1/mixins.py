@@ -0,0 +1,74 @@
+from hashlib import md5
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+from recipes.cache import get_cache, make_key
+from rest_framework.renderers import JSONRenderer
+
+
+def conditional_response(request, validators, last_modified, handler):
+    '''
+    Answer If-None-Match and If-Modified-Since with 304 using cheap
+    validators, before `handler` loads and serializes anything.
+    Responses hold per-user flags, so the ETag depends on the user.
+    '''
+    etag = 'W/' + quote_etag(md5(':'.join(map(str, (
+        request.user.id,
+        request.accepted_renderer.format,
+        request.get_full_path(),
+        *validators,
+    ))).encode()).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = handler()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class CachedResponseMixin:
+    '''
+    Cache rendered JSON of list and retrieve responses under the
+    `cache_namespace` version and answer If-None-Match with 304.
+    '''
+    cache_namespace = None
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        cache = get_cache()
+        key = make_key(self.cache_namespace, request.get_full_path())
+        cached = cache.get(key)
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            content = JSONRenderer().render(response.data)
+            cached = (quote_etag(md5(content).hexdigest()), content)
+            cache.set(key, cached)
+        etag, content = cached
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,42 @@
+from django.core.paginator import Paginator
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+
+
+class RecipePagination(PageNumberPagination):
+    '''
+    Page number pagination by default. '?pagination=cursor' switches to
+    keyset pagination over (pub_date, id), which skips COUNT(*) and
+    OFFSET scans on deep pages.
+    '''
+    cursor_paginator = None
+    known_count = None
+
+    def django_paginator_class(self, object_list, per_page):
+        '''Paginator reusing the count the view has already queried.'''
+        paginator = Paginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+    @staticmethod
+    def uses_cursor(request):
+        return (request.query_params.get('pagination') == 'cursor'
+                or 'cursor' in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None, count=None):
+        if self.uses_cursor(request):
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.known_count = count
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
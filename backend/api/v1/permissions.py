@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework.permissions import (SAFE_METHODS, BasePermission,
                                         IsAuthenticatedOrReadOnly)
 
@@ -11,3 +12,10 @@ class IsOwnerOrReadOnly(IsAuthenticatedOrReadOnly):
     def has_object_permission(self, request, view, obj):
         return (request.method in SAFE_METHODS
                 or obj.author == request.user)
+
+
+class IsMetricsScraper(BasePermission):
+    def has_permission(self, request, view):
+        return (request.user.is_staff
+                or request.META.get('REMOTE_ADDR')
+                in settings.METRICS_ALLOWED_IPS)
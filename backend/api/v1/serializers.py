@@ -1,12 +1,44 @@
+from api.metrics import TimedSerializerMixin, serializer_timer
+from django.db import transaction
+from django.db.models import F
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipes.models import (Favorites, Follow, Ingredient, Recipe,
-                            RecipeAndIngredient, ShoppingCart, Tag)
+from recipes.cache import bump_on_commit
+from recipes.images import schedule_variants, variant_urls
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeAndIngredient,
+                            Tag, load_recipe_relations)
+from recipes.relations import load_relations
+from recipes.search import update_search_vector
 from rest_framework import serializers
 from users.models import User
 
+from .cards import get_cards
 
-class RecipeShortRepresentationSerializer(serializers.ModelSerializer):
+
+def get_user_relations(context):
+    '''Relations of the current user, loaded once per request.'''
+    request = context['request']
+    if not request.user.is_authenticated:
+        return None
+    if not hasattr(request, 'user_relations'):
+        request.user_relations = load_relations(request.user)
+    return request.user_relations
+
+
+def get_image_variants(recipe, request):
+    if not recipe.image or not recipe.image_variants_ready:
+        return None
+    urls = variant_urls(recipe.image.name)
+    if request is not None:
+        for formats in urls.values():
+            for image_format, url in formats.items():
+                formats[image_format] = request.build_absolute_uri(url)
+    return urls
+
+
+class RecipeShortRepresentationSerializer(
+    TimedSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Recipe
         fields = (
@@ -17,17 +49,12 @@ class RecipeShortRepresentationSerializer(serializers.ModelSerializer):
         )
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, value):
-        user = self.context['request'].user
-        if user.is_authenticated and Follow.objects.filter(
-            user=user,
-            author=value
-        ).exists():
-            return True
-        return False
+        relations = get_user_relations(self.context)
+        return relations is not None and value.id in relations['subscribe']
 
     class Meta:
         model = User
@@ -43,10 +70,7 @@ class CustomUserSerializer(UserSerializer):
 
 class UserGetForSubscribeSerializer(CustomUserSerializer):
     recipes = RecipeShortRepresentationSerializer(many=True, read_only=True)
-    recipes_count = serializers.SerializerMethodField()
-
-    def get_recipes_count(self, value):
-        return Recipe.objects.filter(author=value).count()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -76,7 +100,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         )
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Tag
@@ -101,20 +125,24 @@ class IngredientsWithAmountSerializer(serializers.HyperlinkedModelSerializer):
         )
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
 
 
+class RelatedIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
 class RecipeIngredientAmountSerializer(serializers.ModelSerializer):
     ingredient = IngredientSerializer(read_only=True)
-    id = serializers.PrimaryKeyRelatedField(
-        write_only=True,
-        source='ingredient',
-        queryset=Ingredient.objects.all(),
-    )
+    id = serializers.IntegerField(write_only=True)
 
     class Meta:
         model = RecipeAndIngredient
@@ -140,39 +168,94 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             'cooking_time',
         )
 
+    def validate_ingredients(self, value):
+        ids = [item['id'] for item in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                'Ingredients must not be repeated.'
+            )
+        ingredients = Ingredient.objects.in_bulk(ids)
+        missing = set(ids) - set(ingredients)
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid ingredient ids: {sorted(missing)}.'
+            )
+        for item in value:
+            item['ingredient'] = ingredients[item.pop('id')]
+        return value
+
+    @staticmethod
+    def set_ingredients(recipe, ingredients_data, existing=()):
+        '''
+        Sync recipe ingredients with a single bulk insert, bulk update
+        and delete instead of a query per ingredient.
+        '''
+        existing = {item.ingredient_id: item for item in existing}
+        new_items = []
+        changed_items = []
+        for ingredient_data in ingredients_data:
+            ingredient = ingredient_data['ingredient']
+            amount = ingredient_data['amount']
+            item = existing.pop(ingredient.id, None)
+            if item is None:
+                new_items.append(RecipeAndIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=amount
+                ))
+            elif item.amount != amount:
+                item.amount = amount
+                changed_items.append(item)
+        RecipeAndIngredient.objects.bulk_create(new_items)
+        RecipeAndIngredient.objects.bulk_update(changed_items, ['amount'])
+        if existing:
+            RecipeAndIngredient.objects.filter(
+                id__in=[item.id for item in existing.values()]
+            ).delete()
+        bump_on_commit('recipe_ingredients')
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
+        User.objects.filter(id=recipe.author_id).update(
+            recipes_count=F('recipes_count') + 1
+        )
         recipe.tags.set(tags)
-        for ingredient_data in ingredients_data:
-            RecipeAndIngredient.objects.create(
-                recipe=recipe,
-                ingredient=ingredient_data.get('ingredient'),
-                amount=ingredient_data.get('amount')
-            )
+        self.set_ingredients(recipe, ingredients_data)
+        update_search_vector(recipe)
+        schedule_variants(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients_data = validated_data.pop('ingredients')
-        tags = validated_data.pop('tags')
-        Recipe.objects.filter(id=instance.id).update(**validated_data)
-        recipe = Recipe.objects.get(id=instance.id)
-        recipe.tags.set(tags)
-        rec_ing_for_deleting = RecipeAndIngredient.objects.filter(
-            recipe=recipe
-        )
-        rec_ing_for_deleting.delete()
-        for ingredient_data in ingredients_data:
-            RecipeAndIngredient.objects.create(
-                recipe=recipe,
-                ingredient=ingredient_data.get('ingredient'),
-                amount=ingredient_data.get('amount')
+        ingredients_data = validated_data.pop('ingredients', None)
+        tags = validated_data.pop('tags', None)
+        if 'image' in validated_data:
+            validated_data['image_variants_ready'] = False
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Counters and image_variants_ready are updated elsewhere, so
+        # write back only the fields that changed.
+        instance.save(update_fields=[
+            *validated_data, 'updated_at', 'content_updated_at'
+        ])
+        if 'image' in validated_data:
+            schedule_variants(instance)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients_data is not None:
+            self.set_ingredients(
+                instance,
+                ingredients_data,
+                instance.ingredients_with_amount_set.all()
             )
-        return recipe
+            update_search_vector(instance)
+        return instance
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = CustomUserSerializer(required=True, many=False)
     ingredients = IngredientsWithAmountSerializer(
         source='ingredients_with_amount_set',
@@ -181,24 +264,19 @@ class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(required=False, many=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, value):
+        return get_image_variants(value, self.context.get('request'))
 
     def get_is_favorited(self, value):
-        user = self.context['request'].user
-        if user.is_authenticated and Favorites.objects.filter(
-            user=user,
-            recipe=value
-        ).exists():
-            return True
-        return False
+        relations = get_user_relations(self.context)
+        return relations is not None and value.id in relations['favorite']
 
     def get_is_in_shopping_cart(self, value):
-        user = self.context['request'].user
-        if user.is_authenticated and ShoppingCart.objects.filter(
-            user=user,
-            recipe=value
-        ).exists():
-            return True
-        return False
+        relations = get_user_relations(self.context)
+        return (relations is not None
+                and value.id in relations['shopping_cart'])
 
     class Meta:
         model = Recipe
@@ -211,11 +289,104 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time'
         )
 
 
+def recipe_card(recipe, request):
+    '''The part of RecipeSerializer output that is the same for all.'''
+    return {
+        'id': recipe.id,
+        'tags': [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in recipe.tags.all()
+        ],
+        'author': {
+            'email': recipe.author.email,
+            'id': recipe.author.id,
+            'username': recipe.author.username,
+            'first_name': recipe.author.first_name,
+            'last_name': recipe.author.last_name,
+        },
+        'ingredients': [
+            {
+                'id': amount.ingredient.id,
+                'name': amount.ingredient.name,
+                'measurement_unit': amount.ingredient.measurement_unit,
+                'amount': amount.amount,
+            }
+            for amount in recipe.ingredients_with_amount_set.all()
+        ],
+        'name': recipe.name,
+        'image': (
+            request.build_absolute_uri(recipe.image.url)
+            if recipe.image else None
+        ),
+        'image_variants': get_image_variants(recipe, request),
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+    }
+
+
+def represent_recipes(recipes, context):
+    '''
+    Read-only fast path of RecipeSerializer: builds the same dicts from
+    cached recipe cards and the current user's relations. Relations
+    of the recipes are loaded only for cards missing from the cache.
+    Keep in sync with RecipeSerializer and the nested serializers.
+    '''
+    with serializer_timer():
+        request = context['request']
+        relations = get_user_relations(context) or {
+            'favorite': (), 'shopping_cart': (), 'subscribe': (),
+        }
+        recipes = list(recipes)
+        cards = get_cards(
+            recipes, request,
+            lambda recipe: recipe_card(recipe, request),
+            load_recipe_relations,
+        )
+        representation = []
+        for recipe in recipes:
+            card = cards[recipe.id]
+            representation.append({
+                'id': card['id'],
+                'tags': card['tags'],
+                'author': {
+                    **card['author'],
+                    'is_subscribed':
+                        recipe.author_id in relations['subscribe'],
+                },
+                'ingredients': card['ingredients'],
+                'is_favorited': recipe.id in relations['favorite'],
+                'is_in_shopping_cart':
+                    recipe.id in relations['shopping_cart'],
+                'name': card['name'],
+                'image': card['image'],
+                'image_variants': card['image_variants'],
+                'text': card['text'],
+                'cooking_time': card['cooking_time'],
+            })
+        return representation
+
+
+class CookableRecipeSerializer(RecipeSerializer):
+    missing_ingredients = serializers.SerializerMethodField()
+
+    def get_missing_ingredients(self, value):
+        return self.context['missing_ingredients'][value.id]
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('missing_ingredients',)
+
+
 class FavoriteSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -1,9 +1,10 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CreateDeleteRelatedMixinView, IngredientViewSet,
-                    RecipeDetail, RecipeList, ShoppingCartDownloadAPIView,
-                    SubscribeViewSet, TagViewSet)
+from .views import (CookableRecipeList, CreateDeleteRelatedMixinView,
+                    IngredientViewSet, MetricsAPIView, RecipeDetail,
+                    RecipeList, RelatedBatchView, ShoppingCartDownloadAPIView,
+                    SubscribeViewSet, TagViewSet, TrendingRecipeList)
 
 router_v1 = DefaultRouter()
 router_v1.register(r'tags', TagViewSet, basename='tags')
@@ -17,20 +18,56 @@ router_v1.register(
 
 urlpatterns = [
     path('', include(router_v1.urls)),
+    path(
+        'users/subscribe/',
+        RelatedBatchView.as_view(),
+        {'related': 'subscribe'},
+        name='subscribe-batch'
+    ),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
-    path('recipes/', RecipeList.as_view()),
-    path('recipes/<int:instance_id>/', RecipeDetail.as_view()),
+    path('metrics/', MetricsAPIView.as_view(), name='metrics'),
+    path('recipes/', RecipeList.as_view(), name='recipes'),
+    path(
+        'recipes/trending/',
+        TrendingRecipeList.as_view(),
+        name='recipes-trending'
+    ),
+    path(
+        'recipes/cookable/',
+        CookableRecipeList.as_view(),
+        name='recipes-cookable'
+    ),
+    path(
+        'recipes/<int:instance_id>/',
+        RecipeDetail.as_view(),
+        name='recipe-detail'
+    ),
     path(
         'recipes/download_shopping_cart/',
-        ShoppingCartDownloadAPIView.as_view()
+        ShoppingCartDownloadAPIView.as_view(),
+        name='download-shopping-cart'
+    ),
+    path(
+        'recipes/favorite/',
+        RelatedBatchView.as_view(),
+        {'related': 'favorite'},
+        name='favorite-batch'
+    ),
+    path(
+        'recipes/shopping_cart/',
+        RelatedBatchView.as_view(),
+        {'related': 'shopping_cart'},
+        name='shopping-cart-batch'
     ),
     path(
         'recipes/<int:instance_id>/<str:related>/',
-        CreateDeleteRelatedMixinView.as_view()
+        CreateDeleteRelatedMixinView.as_view(),
+        name='recipe-related'
     ),
     path(
         'users/<int:instance_id>/<str:related>/',
-        CreateDeleteRelatedMixinView.as_view()
+        CreateDeleteRelatedMixinView.as_view(),
+        name='user-related'
     ),
 ]
@@ -1,25 +1,69 @@
-from django.http import HttpResponse
-from recipes.models import Recipe, RecipeAndIngredient, ShoppingCart
-
-
-def get_shopping_cart(user):
-    ingredient_list = [f'{user.username}`s shopping cart.\n\n']
-    ingredient_dict = {}
-    shopping_cart = ShoppingCart.objects.filter(user=user)
-    for wanna_recipe in shopping_cart:
-        recipe = Recipe.objects.get(id=wanna_recipe.recipe.id)
-        ingredients = RecipeAndIngredient.objects.filter(recipe=recipe)
-        for ingredient in ingredients:
-            ingredient_dict[
-                f'{ingredient.ingredient.name}'
-                f'({ingredient.ingredient.measurement_unit})'
-            ] = ingredient.amount + ingredient_dict.setdefault(
-                f'{ingredient.ingredient.name}'
-                f'({ingredient.ingredient.measurement_unit})', 0
-            )
-    for key, value in ingredient_dict.items():
-        ingredient_list.append(f'{key} - {value}\n')
-    content = ingredient_list
-    response = HttpResponse(content, content_type='text/plain')
-    response['Content-Disposition'] = 'attachment'
+import csv
+
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
+from recipes.models import RecipeAndIngredient
+
+
+class Echo:
+    '''Pseudo-buffer for csv.writer, returns written value instead.'''
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_cart_ingredients(user):
+    '''
+    Sum up amounts of ingredients for all recipes from the user's cart
+    with a single GROUP BY query.
+    '''
+    return RecipeAndIngredient.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+    ).annotate(
+        total=Sum('amount')
+    ).order_by(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+    )
+
+
+def shopping_cart_txt(user):
+    yield f'{user.username}`s shopping cart.\n\n'
+    for ingredient in get_shopping_cart_ingredients(user).iterator():
+        yield (
+            f'{ingredient["ingredient__name"]}'
+            f'({ingredient["ingredient__measurement_unit"]})'
+            f' - {ingredient["total"]}\n'
+        )
+
+
+def shopping_cart_csv(user):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ingredient in get_shopping_cart_ingredients(user).iterator():
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['total'],
+        ))
+
+
+shopping_cart_formats = {
+    'txt': (shopping_cart_txt, 'text/plain'),
+    'csv': (shopping_cart_csv, 'text/csv'),
+}
+
+
+def get_shopping_cart(user, file_format='txt'):
+    lines, content_type = shopping_cart_formats[file_format]
+    response = StreamingHttpResponse(
+        lines(user),
+        content_type=f'{content_type}; charset=utf-8'
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_cart.{file_format}"'
+    )
     return response
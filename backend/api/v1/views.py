@@ -1,21 +1,34 @@
+from api.metrics import registry
+from django.db import transaction
+from django.db.models import F, Prefetch
+from django.db.models.functions import Greatest
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
+from recipes.ingredient_index import ingredient_index
+from recipes.matching import recipe_ingredient_index
 from recipes.models import (Favorites, Follow, Ingredient, Recipe,
                             ShoppingCart, Tag)
+from recipes.relations import delete_relations, relations_changed
 from rest_framework import generics, serializers, status, viewsets
 from rest_framework.generics import GenericAPIView
 from rest_framework.mixins import CreateModelMixin, DestroyModelMixin
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from users.models import User
 
-from .filter import IngredientFilter, RecipeFilter
-from .permissions import IsOwner, IsOwnerOrReadOnly
-from .serializers import (IngredientSerializer, RecipeCreateSerializer,
-                          RecipeSerializer,
-                          RecipeShortRepresentationSerializer, TagSerializer,
-                          UserGetForSubscribeSerializer)
+from .filter import RecipeFilter
+from .mixins import CachedResponseMixin, conditional_response
+from .pagination import RecipePagination
+from .permissions import IsMetricsScraper, IsOwner, IsOwnerOrReadOnly
+from .renderers import CSVRenderer, FastJSONRenderer, PlainTextRenderer
+from .serializers import (CookableRecipeSerializer, IngredientSerializer,
+                          RecipeCreateSerializer, RecipeSerializer,
+                          RecipeShortRepresentationSerializer,
+                          RelatedIdsSerializer, TagSerializer,
+                          UserGetForSubscribeSerializer, represent_recipes)
 from .utils import get_shopping_cart
 
 related_dict = {
@@ -23,61 +36,147 @@ related_dict = {
         Favorites,
         'recipe',
         Recipe.objects.all(),
-        RecipeShortRepresentationSerializer
+        RecipeShortRepresentationSerializer,
+        'favorites_count',
     ),
     'shopping_cart': (
         ShoppingCart,
         'recipe',
         Recipe.objects.all(),
-        RecipeShortRepresentationSerializer
+        RecipeShortRepresentationSerializer,
+        None,
     ),
     'subscribe': (
         Follow,
         'author',
         User.objects.all(),
-        UserGetForSubscribeSerializer
+        UserGetForSubscribeSerializer,
+        'followers_count',
     ),
 }
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+# Every recipe has a score, so the join is inner and the descending
+# order is a backward scan of the score index.
+recipe_orderings = {
+    'popular': ('-score__popular', '-pub_date'),
+    'trending': ('-score__trending', '-pub_date'),
+}
+
+
+# Largest value of an AutoField id.
+MAX_ID = 2 ** 31 - 1
+
+
+def change_counter(queryset, ids, counter, delta):
+    '''
+    Atomically shift a denormalized counter of the related objects,
+    never below zero, so a drifted counter does not break requests.
+    '''
+    if counter is not None and ids:
+        queryset.filter(id__in=ids).update(
+            **{counter: Greatest(F(counter) + delta, 0)}
+        )
+
+
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     '''Viewset with logic for displaying a list or single tags.'''
+    cache_namespace = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
-    '''Viewset with logic for displaying a list or single ingredients.'''
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    '''
+    Viewset with logic for displaying a list or single ingredients.
+    The list is served from the in-memory ingredient index, '?name='
+    returns up to `search_limit` ingredients, name prefix matches first.
+    '''
+    cache_namespace = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
+    search_limit = 50
+
+    def list(self, request):
+        return self.cached_response(self.search, request)
+
+    def search(self, request):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name, self.search_limit))
+        return Response(ingredient_index.all())
 
 
 class RecipeList(generics.ListCreateAPIView):
-    '''View with logic for displaying a list and creating recipes.'''
+    '''
+    View with logic for displaying a list and creating recipes.
+    '?ordering=popular|trending' ranks recipes by precomputed scores.
+    '''
     serializer_class = RecipeSerializer
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    default_ordering = None
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Recipe.objects.all()
-        is_in_shopping_cart = self.request.query_params.get(
-            'is_in_shopping_cart'
-        )
-        if is_in_shopping_cart:
-            is_in_shopping_cart = int(is_in_shopping_cart)
-        if (user.is_authenticated and is_in_shopping_cart):
-            return queryset.filter(shopping_cart__user=user)
-        is_favorited = self.request.query_params.get('is_favorited')
-        if is_favorited:
-            is_favorited = int(is_favorited)
-        if (user.is_authenticated and is_favorited):
-            return queryset.filter(favorites__user=user)
-        return queryset
+        ordering = recipe_orderings.get(
+            self.request.query_params.get('ordering', self.default_ordering)
+        )
+        # Rows are rendered from cached cards, never from the vector.
+        recipes = Recipe.objects.defer('search_vector')
+        if ordering is None:
+            return recipes
+        return recipes.filter(score__isnull=False).order_by(*ordering)
+
+    def list(self, request):
+        '''
+        Lists are validated by ETag only: Last-Modified cannot tell
+        that a recipe left a filtered list, e.g. '?is_favorited=1'.
+        '''
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator.uses_cursor(request):
+            return self.list_cursor_page(queryset)
+        count, last_modified = queryset.last_change()
+        return conditional_response(
+            request,
+            (count, last_modified),
+            None,
+            lambda: self.list_page(queryset, count),
+        )
+
+    def list_page(self, queryset, count):
+        page = self.paginator.paginate_queryset(
+            queryset, self.request, view=self, count=count
+        )
+        context = self.get_serializer_context()
+        if page is None:
+            return Response(represent_recipes(queryset, context))
+        return self.get_paginated_response(represent_recipes(page, context))
+
+    def list_cursor_page(self, queryset):
+        '''
+        Cursor pages are validated by their own rows, so they are
+        answered without the COUNT the cursor mode exists to avoid.
+        '''
+        page = self.paginator.paginate_queryset(
+            queryset, self.request, view=self
+        )
+        cursor_paginator = self.paginator.cursor_paginator
+        return conditional_response(
+            self.request,
+            (
+                *((recipe.id, recipe.updated_at) for recipe in page),
+                cursor_paginator.get_next_link(),
+                cursor_paginator.get_previous_link(),
+            ),
+            None,
+            lambda: self.get_paginated_response(
+                represent_recipes(page, self.get_serializer_context())
+            ),
+        )
 
     def post(self, request):
         serializer = RecipeCreateSerializer(data=request.data)
@@ -88,19 +187,101 @@ class RecipeList(generics.ListCreateAPIView):
             )
         saved_obj = serializer.save(author=self.request.user)
         response_data = RecipeSerializer(
-            saved_obj,
+            Recipe.objects.with_relations().get(id=saved_obj.id),
             context={'request': request}
         ).data
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
+class TrendingRecipeList(RecipeList):
+    '''View with logic for displaying recipes trending right now.'''
+    http_method_names = ('get', 'head', 'options')
+    default_ordering = 'trending'
+
+
+class CookableRecipeList(generics.ListAPIView):
+    '''
+    View with logic for displaying recipes that can be cooked from
+    the '?ingredients=' ids, fully makeable first, then by the number
+    of missing ingredients. Recipe filters narrow the list down.
+    '''
+    serializer_class = CookableRecipeSerializer
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = RecipeFilter
+    queryset = Recipe.objects.all()
+
+    def get_ingredient_ids(self):
+        ids = []
+        for value in self.request.query_params.getlist('ingredients'):
+            ids.extend(value.split(','))
+        if not all(ingredient_id.isdecimal() for ingredient_id in ids):
+            raise serializers.ValidationError(
+                {'ingredients': 'Ingredient ids must be integers.'}
+            )
+        ids = set(map(int, ids))
+        unknown = ids - set(Ingredient.objects.filter(
+            id__in=[
+                ingredient_id for ingredient_id in ids
+                if ingredient_id <= MAX_ID
+            ]
+        ).values_list('id', flat=True))
+        if unknown:
+            raise serializers.ValidationError({
+                'ingredients': f'Unknown ingredient ids: {sorted(unknown)}.'
+            })
+        return ids
+
+    def list(self, request):
+        matches = recipe_ingredient_index.match(self.get_ingredient_ids())
+        if set(request.query_params) & set(self.filterset_class.base_filters):
+            allowed = set(self.filter_queryset(
+                self.get_queryset()
+            ).values_list('id', flat=True))
+            matches = [match for match in matches if match[0] in allowed]
+        page = self.paginate_queryset(matches)
+        missing_ingredients = dict(page)
+        recipes = Recipe.objects.with_relations().in_bulk(
+            missing_ingredients
+        )
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id, _ in page
+             if recipe_id in recipes],
+            many=True,
+        )
+        serializer.context['missing_ingredients'] = missing_ingredients
+        return self.get_paginated_response(serializer.data)
+
+
 class RecipeDetail(generics.RetrieveUpdateDestroyAPIView):
     '''RUD logic for a single recipe.'''
-    queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsOwnerOrReadOnly,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     lookup_url_kwarg = 'instance_id'
 
+    def get_queryset(self):
+        return Recipe.objects.with_relations()
+
+    def retrieve(self, request, instance_id):
+        recipe = get_object_or_404(
+            Recipe.objects.defer('search_vector'), id=instance_id
+        )
+        return conditional_response(
+            request,
+            (recipe.updated_at,),
+            recipe.updated_at,
+            lambda: Response(represent_recipes(
+                (recipe,), self.get_serializer_context()
+            )[0]),
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        User.objects.filter(id=instance.author_id).update(
+            recipes_count=Greatest(F('recipes_count') - 1, 0)
+        )
+
     def partial_update(self, request, instance_id):
         recipe = get_object_or_404(Recipe, id=instance_id)
         serializer = RecipeCreateSerializer(
@@ -115,7 +296,7 @@ class RecipeDetail(generics.RetrieveUpdateDestroyAPIView):
             )
         saved_obj = serializer.save()
         response_data = RecipeSerializer(
-            saved_obj,
+            self.get_queryset().get(id=saved_obj.id),
             context={'request': request}
         ).data
         return Response(
@@ -130,12 +311,20 @@ class SubscribeViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsOwner,)
 
     def get_queryset(self):
-        user = self.request.user
-        subscriptions = Follow.objects.filter(user=user)
-        user_list = []
-        for subscription in subscriptions:
-            user_list.append(subscription.author)
-        return user_list
+        recipes = Recipe.objects.defer('search_vector')
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.latest_per_author(
+                int(recipes_limit),
+                Follow.objects.filter(
+                    user=self.request.user
+                ).values('author_id'),
+            )
+        return User.objects.filter(
+            following__user=self.request.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        )
 
 
 class CreateDeleteRelatedMixinView(
@@ -149,10 +338,16 @@ class CreateDeleteRelatedMixinView(
     '''
     permission_classes = (IsAuthenticated,)
 
+    @transaction.atomic
     def post(self, request, instance_id, related):
-        related_model, field_name, queryset, serializer = related_dict[related]
+        (related_model, field_name, queryset,
+         serializer, counter) = related_dict[related]
         obj = get_object_or_404(queryset, id=instance_id)
         user = self.request.user
+        if related == 'subscribe' and obj == user:
+            raise serializers.ValidationError(
+                'You can not subscribe to yourself.'
+            )
         if not related_model.objects.get_or_create(
             user=user,
             **{field_name: obj}
@@ -160,14 +355,16 @@ class CreateDeleteRelatedMixinView(
             raise serializers.ValidationError(
                 f"The {field_name} has already been added to {related} list."
             )
+        change_counter(queryset, (obj.id,), counter, 1)
         serializer = serializer(obj, context={'request': request})
         return Response(
             serializer.data,
             status=status.HTTP_201_CREATED
         )
 
+    @transaction.atomic
     def delete(self, request, instance_id, related):
-        related_model, field_name, queryset, _ = related_dict[related]
+        related_model, field_name, queryset, _, counter = related_dict[related]
         obj = get_object_or_404(queryset, id=instance_id)
         user = self.request.user
         if not related_model.objects.filter(
@@ -177,14 +374,98 @@ class CreateDeleteRelatedMixinView(
             raise serializers.ValidationError(
                 f"The {field_name} is not in {related} list."
             )
+        change_counter(queryset, (obj.id,), counter, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class RelatedBatchView(APIView):
+    '''
+    Add or remove many related connections of one kind at once:
+    POST or DELETE {"ids": [...]} to sync a whole cart in one request.
+    Already added or missing connections are skipped. Bulk queries do
+    not send signals, so their side effects are applied here at once.
+    '''
+    permission_classes = (IsAuthenticated,)
+
+    def get_ids(self, request):
+        serializer = RelatedIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return set(serializer.validated_data['ids'])
+
+    def current(self, related_model, field_name, ids):
+        '''When each of the user's existing relations to `ids` was added.'''
+        return dict(related_model.objects.filter(
+            user=self.request.user,
+            **{f'{field_name}_id__in': ids}
+        ).values_list(f'{field_name}_id', 'added_at'))
+
+    def apply(self, related, added_at, delta):
+        _, _, queryset, _, counter = related_dict[related]
+        change_counter(queryset, list(added_at), counter, delta)
+        relations_changed(self.request.user.id, related, added_at, delta)
+
+    @transaction.atomic
+    def post(self, request, related):
+        related_model, field_name, queryset, _, _ = related_dict[related]
+        ids = self.get_ids(request)
+        unknown = ids - set(
+            queryset.filter(id__in=ids).values_list('id', flat=True)
+        )
+        if unknown:
+            raise serializers.ValidationError({
+                'ids': f'Unknown {field_name} ids: {sorted(unknown)}.'
+            })
+        if related == 'subscribe' and request.user.id in ids:
+            raise serializers.ValidationError(
+                {'ids': 'You can not subscribe to yourself.'}
+            )
+        added = ids - self.current(related_model, field_name, ids).keys()
+        now = timezone.now()
+        related_model.objects.bulk_create(
+            (
+                related_model(
+                    user=request.user, added_at=now,
+                    **{f'{field_name}_id': related_id}
+                )
+                for related_id in added
+            ),
+            ignore_conflicts=True,
+        )
+        self.apply(related, dict.fromkeys(added, now), 1)
+        return Response({'ids': sorted(added)}, status=status.HTTP_201_CREATED)
+
+    @transaction.atomic
+    def delete(self, request, related):
+        related_model, field_name, _, _, _ = related_dict[related]
+        ids = self.get_ids(request)
+        removed = self.current(related_model, field_name, ids)
+        delete_relations(related_model, request.user.id, list(removed))
+        self.apply(related, removed, -1)
+        return Response({'ids': sorted(removed)}, status=status.HTTP_200_OK)
+
+
 class ShoppingCartDownloadAPIView(APIView):
     '''
     View with logic to download list of ingredients for recipes from cart.
+    The file format is chosen by '?format=txt|csv' or the Accept header.
     '''
     permission_classes = (IsOwner,)
+    renderer_classes = (PlainTextRenderer, CSVRenderer)
 
     def get(self, request):
-        return get_shopping_cart(self.request.user)
+        return get_shopping_cart(
+            self.request.user,
+            request.accepted_renderer.format
+        )
+
+
+class MetricsAPIView(APIView):
+    '''Request metrics of this process in Prometheus text format.'''
+    permission_classes = (IsMetricsScraper,)
+    renderer_classes = (PlainTextRenderer,)
+
+    def get(self, request):
+        return Response(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
@@ -0,0 +1,146 @@
+'''
+PostgreSQL backend taking connections from a per-process pool, for
+threaded gunicorn workers. Django closes connections at the end of
+every request when CONN_MAX_AGE is 0, which returns them to the pool.
+DATABASES[alias]['POOL'] sets the pool SIZE and the TIMEOUT to wait
+for a free connection.
+'''
+import threading
+import time
+
+import psycopg2
+from django.conf import settings
+from django.db.backends.postgresql import base, creation
+from psycopg2.extensions import connection as psycopg2_connection
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PooledConnection(psycopg2_connection):
+    released_at = None
+    pool = None
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    '''Waits for a free connection instead of failing when all are used.'''
+
+    def __init__(self, size, timeout, **conn_params):
+        # psycopg2 pools keep at most minconn idle connections and close
+        # the rest, so the pool is opened at its full size.
+        super().__init__(
+            size, size, connection_factory=PooledConnection, **conn_params
+        )
+        self.conn_params = conn_params
+        self.retired = False
+        self._slots = threading.BoundedSemaphore(size)
+        self._timeout = timeout
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self._timeout):
+            raise PoolError('Timed out waiting for a database connection.')
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close or self.retired)
+        finally:
+            self._slots.release()
+
+    def retire(self):
+        '''
+        Close the idle connections of a pool replaced by a new one; the
+        ones in use are closed when they are returned.
+        '''
+        with self._lock:
+            self.retired = True
+            for connection in self._pool:
+                connection.close()
+            self._pool.clear()
+
+
+def is_alive(connection):
+    try:
+        connection.cursor().execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except psycopg2.Error:
+        return False
+    return True
+
+
+def retire_pool(alias):
+    with pools_lock:
+        pool = pools.pop(alias, None)
+    if pool is not None:
+        pool.retire()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections would keep the test database in use.
+        retire_pool(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_pool(self, conn_params):
+        '''
+        The alias's pool, replaced when the connection parameters
+        change, e.g. when the test runner switches to the test database.
+        '''
+        with pools_lock:
+            pool = pools.get(self.alias)
+            if pool is not None and pool.conn_params == conn_params:
+                return pool
+            if pool is not None:
+                pool.retire()
+            options = self.settings_dict.get('POOL', {})
+            pools[self.alias] = BlockingConnectionPool(
+                options.get('SIZE', 10),
+                options.get('TIMEOUT', 30),
+                **conn_params
+            )
+            return pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        connection = pool.getconn()
+        # Connections idle in the pool for a while may have been dropped,
+        # all of them at once if the server restarted. Closed ones are
+        # replaced with new connections.
+        for _ in range(pool.maxconn):
+            if ((connection.released_at is not None
+                    and time.monotonic() - connection.released_at
+                    <= settings.DB_HEALTH_CHECK_INTERVAL)
+                    or is_alive(connection)):
+                break
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
+        connection.pool = pool
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        self.connection.released_at = time.monotonic()
+        with self.wrap_database_errors:
+            self.connection.pool.putconn(
+                self.connection, close=bool(self.connection.closed)
+            )
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 from dotenv import load_dotenv
 
@@ -40,6 +41,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
+    'api.middleware.MetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -63,17 +65,65 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 
+DB_ENGINE = os.getenv('DB_ENGINE', default='django.db.backends.postgresql')
+
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DB_ENGINE', default='django.db.backends.postgresql'),
+        'ENGINE': DB_ENGINE,
         'NAME': os.getenv('DB_NAME', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
         'PORT': os.getenv('DB_PORT', default='5432'),
+        # Pooled connections go back to the pool after every request.
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE',
+            default=0 if DB_ENGINE == 'backend.postgresql_pool' else 60
+        )),
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', default=10)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=30)),
+        },
     }
 }
 
+# Persistent connections idle longer than this are pinged before use.
+DB_HEALTH_CHECK_INTERVAL = int(
+    os.getenv('DB_HEALTH_CHECK_INTERVAL', default=30)
+)
+
+# Read by gunicorn.conf.py too; more than one needs a shared cache.
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', default=1))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+CATALOG_CACHE = 'default'
+
+RELATIONS_CACHE = 'default'
+
+RECIPE_CARD_CACHE = 'default'
+RECIPE_CARD_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_CARD_CACHE_TIMEOUT', default=24 * 60 * 60)
+)
+
+AUTH_CACHE = 'default'
+AUTH_CACHE_TIMEOUT = int(os.getenv('AUTH_CACHE_TIMEOUT', default=300))
+AUTH_LOCAL_CACHE_SIZE = 1024
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+
+TRENDING_HALF_LIFE = timedelta(
+    days=float(os.getenv('TRENDING_HALF_LIFE_DAYS', default=7))
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -105,6 +155,20 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+
+# Query budgets by '<method> <view name>'; 'raise' makes a request over
+# its budget fail instead of logging a warning.
+QUERY_BUDGETS = {
+    'GET api:recipes': 10,
+    'GET api:subscriptions-list': 8,
+    'GET api:download-shopping-cart': 3,
+}
+QUERY_BUDGET_ACTION = os.getenv('QUERY_BUDGET_ACTION', default='log')
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', default='127.0.0.1'
+).split(',')
+
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
@@ -113,7 +177,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
@@ -0,0 +1,23 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', default=1))
+threads = int(os.getenv('GUNICORN_THREADS', default=1))
+worker_class = os.getenv(
+    'GUNICORN_WORKER_CLASS', default='gthread' if threads > 1 else 'sync'
+)
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+
+
+def on_starting(server):
+    '''
+    Run Django system checks with the actual number of workers, so
+    the server does not start workers that would not share caches.
+    '''
+    os.environ['GUNICORN_WORKERS'] = str(server.cfg.workers)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('check')
@@ -13,10 +13,6 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'favorites_count')
     list_filter = ('author', 'name', 'tags')
 
-    def favorites_count(self, obj):
-        return Favorites.objects.filter(recipe=obj).count()
-    favorites_count.short_description = 'Add to favorites, times'
-
 
 class IngredientAdmin(admin.ModelAdmin):
     list_filter = ('name',)
@@ -0,0 +1,56 @@
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE]
+
+
+def is_shared(cache):
+    '''Whether all server processes see the same cache.'''
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def get_version(namespace, cache=None):
+    '''
+    Current version of the cached data in the namespace. A missing
+    version starts from a timestamp, so keys of an evicted version
+    are never reused.
+    '''
+    cache = cache or get_cache()
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is not None:
+        return version
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def bump_version(namespace, cache=None):
+    cache = cache or get_cache()
+    key = f'{namespace}:version'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_on_commit(namespace, cache=None):
+    '''
+    Bump now, so the rest of the transaction sees its changes, and
+    after commit too, or another process could cache the old data
+    under the new version before the change is visible.
+    '''
+    bump = partial(bump_version, namespace, cache)
+    bump()
+    transaction.on_commit(bump)
+
+
+def make_key(namespace, *parts):
+    return ':'.join(map(str, (namespace, get_version(namespace), *parts)))
@@ -0,0 +1,114 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = {
+    'thumbnail': (360, 360),
+    'card': (720, 720),
+}
+IMAGE_FORMATS = {
+    'jpeg': 'jpg',
+    'webp': 'webp',
+}
+
+executor = (
+    ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    if settings.IMAGE_WORKERS else None
+)
+
+
+def variant_name(name, variant, image_format):
+    root = os.path.splitext(name)[0]
+    return f'{root}_{variant}.{IMAGE_FORMATS[image_format]}'
+
+
+def variant_urls(name):
+    return {
+        variant: {
+            image_format: default_storage.url(
+                variant_name(name, variant, image_format)
+            )
+            for image_format in IMAGE_FORMATS
+        }
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def open_image(file):
+    '''
+    The image in RGB, or in RGBA if it has transparency, which WebP
+    keeps and JPEG does not.
+    '''
+    image = Image.open(file)
+    transparent = (
+        image.mode in ('RGBA', 'LA', 'PA')
+        or 'transparency' in image.info
+    )
+    return image.convert('RGBA' if transparent else 'RGB')
+
+
+def flatten(image):
+    '''Put transparent areas of an RGBA image on white for JPEG.'''
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def generate_variants(recipe_id, name):
+    '''
+    Save resized JPEG and WebP copies of the recipe image and mark them
+    ready, unless the image was replaced in the meantime.
+    '''
+    try:
+        with default_storage.open(name) as file:
+            image = open_image(file)
+        for variant, size in IMAGE_VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            for image_format in IMAGE_FORMATS:
+                output = (
+                    resized if image_format == 'webp' else flatten(resized)
+                )
+                buffer = BytesIO()
+                output.save(buffer, image_format.upper(), quality=85)
+                path = variant_name(name, variant, image_format)
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+                default_storage.save(path, ContentFile(buffer.getvalue()))
+        Recipe.objects.filter(id=recipe_id, image=name).update(
+            image_variants_ready=True,
+            updated_at=timezone.now(),
+            content_updated_at=timezone.now(),
+        )
+    except Exception:
+        logger.exception('Failed to generate variants of %s', name)
+    finally:
+        if executor is not None:
+            connection.close()
+
+
+def schedule_variants(recipe):
+    '''Generate image variants in the worker pool after commit.'''
+    recipe_id, name = recipe.id, recipe.image.name
+
+    def submit():
+        if executor is None:
+            generate_variants(recipe_id, name)
+        else:
+            executor.submit(generate_variants, recipe_id, name)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,62 @@
+import threading
+from bisect import bisect_left
+
+from .cache import get_version
+from .models import Ingredient
+
+
+class IngredientIndex:
+    '''
+    Process-local index of ingredients sorted by casefolded name.
+    Built lazily from the database and rebuilt when the 'ingredients'
+    cache version is bumped.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+
+    def _get_index(self):
+        version = get_version('ingredients')
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._index = self._build()
+                    self._version = version
+        return self._index
+
+    @staticmethod
+    def _build():
+        ingredients = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda item: (item['name'].casefold(), item['id'])
+        )
+        keys = [item['name'].casefold() for item in ingredients]
+        return keys, ingredients
+
+    def all(self):
+        return self._get_index()[1]
+
+    def search(self, query, limit):
+        '''
+        Return up to `limit` ingredients whose name starts with `query`,
+        followed by the ones containing it elsewhere in the name.
+        '''
+        keys, ingredients = self._get_index()
+        query = query.casefold()
+        result = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(query)):
+            result.append(ingredients[position])
+            position += 1
+        for key, ingredient in zip(keys, ingredients):
+            if len(result) >= limit:
+                break
+            if key.find(query) > 0:
+                result.append(ingredient)
+        return result
+
+
+ingredient_index = IngredientIndex()
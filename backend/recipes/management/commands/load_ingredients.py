@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+from itertools import islice
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from recipes.cache import bump_version
+from recipes.models import Ingredient
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file, chunk_size=64 * 1024):
+    '''
+    Yield items of a JSON array of {"name", "measurement_unit"} objects
+    without loading the whole file into memory.
+    '''
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n[,':
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                if buffer[position:].strip():
+                    raise CommandError('Malformed JSON file.')
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Load ingredients from a CSV or JSON file. Existing '
+        '(name, measurement_unit) pairs are skipped, so it is safe to rerun.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_PATH)
+        parser.add_argument('--format', choices=READERS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def clean_rows(self, rows):
+        max_length = Ingredient._meta.get_field('name').max_length
+        for name, measurement_unit in rows:
+            self.read += 1
+            name = name.strip()
+            measurement_unit = measurement_unit.strip()
+            if (not name or not measurement_unit
+                    or len(name) > max_length
+                    or len(measurement_unit) > max_length):
+                self.skipped += 1
+                continue
+            yield name, measurement_unit
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.')
+        )
+        if file_format not in READERS:
+            raise CommandError(
+                f'Unknown file format "{file_format}", use --format.'
+            )
+        self.read = self.skipped = 0
+        count_before = Ingredient.objects.count()
+        start = perf_counter()
+        with open(path, encoding='utf-8') as file:
+            rows = self.clean_rows(READERS[file_format](file))
+            while True:
+                batch = set(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in batch
+                    ),
+                    ignore_conflicts=True,
+                )
+        elapsed = perf_counter() - start
+        bump_version('ingredients')
+        created = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {self.read} rows in {elapsed:.2f}s '
+            f'({self.read / elapsed if elapsed else 0:.0f} rows/s): '
+            f'{created} created, {self.skipped} invalid, '
+            f'{self.read - self.skipped - created} duplicates.'
+        ))
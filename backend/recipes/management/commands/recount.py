@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Favorites, Follow, Recipe
+from users.models import User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorites, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'author'),
+)
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized counters of recipes and users.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, counter, related_model, field in COUNTERS:
+            actual = count_of(related_model, field)
+            drifted = model.objects.annotate(
+                actual=actual
+            ).exclude(**{counter: F('actual')}).values('id')
+            fixed = model.objects.filter(
+                id__in=drifted
+            ).update(**{counter: actual})
+            self.stdout.write(
+                f'{model._meta.model_name}.{counter}: {fixed} fixed'
+            )
@@ -0,0 +1,200 @@
+import random
+from collections import Counter
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from recipes.cache import bump_on_commit
+from recipes.models import (Favorites, Follow, Ingredient, Recipe,
+                            RecipeAndIngredient, RecipeScore, ShoppingCart,
+                            Tag)
+from recipes.scores import trending_score
+from recipes.search import refresh_search_vectors
+from users.models import User
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+)
+
+
+def zipf_weights(count):
+    '''Cumulative weights where the n-th item is n times rarer.'''
+    return list(accumulate(1 / rank for rank in range(1, count + 1)))
+
+
+def sample(population, cum_weights, count):
+    '''Up to `count` distinct items, skewed towards popular ones.'''
+    return set(random.choices(population, cum_weights=cum_weights, k=count))
+
+
+class Command(BaseCommand):
+    help = (
+        'Create synthetic users, recipes, follows, favorites and shopping '
+        'carts for load testing. Ingredient, author and recipe popularity '
+        'follow a Zipf distribution.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--cart', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def bulk_create(self, model, objects, **kwargs):
+        '''
+        Django 2.2 does not cap an explicit batch size by the backend
+        limits (999 parameters on SQLite), so cap it here.
+        '''
+        objects = list(objects)
+        batch_size = min(self.batch_size, connection.ops.bulk_batch_size(
+            model._meta.concrete_fields, objects
+        ))
+        model.objects.bulk_create(
+            objects, batch_size=max(batch_size, 1), **kwargs
+        )
+
+    def created_ids(self, model, create):
+        '''
+        Ids of rows inserted by `create`. SQLite does not return them
+        from bulk_create, so they are read back as ids above the old max.
+        '''
+        last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        create(last_id)
+        return list(
+            model.objects.filter(id__gt=last_id).order_by(
+                'id'
+            ).values_list('id', flat=True)
+        )
+
+    def create_users(self, count):
+        password = make_password('synthetic')
+        return self.created_ids(User, lambda last_id: self.bulk_create(User, (
+            User(
+                username=f'synthetic{number}',
+                email=f'synthetic{number}@example.com',
+                first_name=f'User {number}',
+                last_name='Synthetic',
+                password=password,
+            )
+            for number in range(last_id + 1, last_id + count + 1)
+        )))
+
+    def create_recipes(self, count, authors, ingredients):
+        author_weights = zipf_weights(len(authors))
+        ingredient_weights = zipf_weights(len(ingredients))
+        contents = [
+            sample(
+                range(len(ingredients)), ingredient_weights,
+                random.randint(3, 12)
+            )
+            for _ in range(count)
+        ]
+        recipe_ids = self.created_ids(Recipe, lambda last_id: (
+            self.bulk_create(Recipe, (
+                Recipe(
+                    author_id=random.choices(
+                        authors, cum_weights=author_weights
+                    )[0],
+                    name=f'{ingredients[min(content)][1]} #{number}'[:100],
+                    text=', '.join(
+                        ingredients[position][1] for position in content
+                    ),
+                    cooking_time=random.randint(5, 180),
+                )
+                for number, content in enumerate(contents, start=1)
+            ))
+        ))
+        tags = [tag.id for tag in self.get_tags()]
+        self.bulk_create(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in random.sample(
+                tags, random.randint(1, min(3, len(tags)))
+            )
+        ))
+        self.bulk_create(RecipeAndIngredient, (
+            RecipeAndIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredients[position][0],
+                amount=random.randint(1, 500),
+            )
+            for recipe_id, content in zip(recipe_ids, contents)
+            for position in content
+        ))
+        return recipe_ids
+
+    def get_tags(self):
+        tags = list(Tag.objects.all())
+        if tags:
+            return tags
+        return [
+            Tag.objects.create(name=name, slug=slug, color=color)
+            for name, slug, color in DEFAULT_TAGS
+        ]
+
+    def create_relations(self, model, field, users, targets, per_user,
+                         skip_self=False):
+        '''Relations of every user to about `per_user` popular targets.'''
+        weights = zipf_weights(len(targets))
+        relations = [
+            model(user_id=user_id, **{f'{field}_id': target_id})
+            for user_id in users
+            for target_id in sample(
+                targets, weights, random.randint(0, 2 * per_user)
+            )
+            if not (skip_self and target_id == user_id)
+        ]
+        self.bulk_create(model, relations, ignore_conflicts=True)
+        return relations
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', stdout=self.stdout)
+        ingredients = list(Ingredient.objects.values_list('id', 'name'))
+        random.shuffle(ingredients)
+        users = self.create_users(options['users'])
+        authors = random.sample(users, len(users))
+        recipes = self.create_recipes(
+            options['recipes'], authors, ingredients
+        )
+        random.shuffle(recipes)
+        self.create_relations(
+            Follow, 'author', users, authors, options['follows'],
+            skip_self=True
+        )
+        interest = Counter()
+        for model, per_user in (
+            (Favorites, options['favorites']),
+            (ShoppingCart, options['cart']),
+        ):
+            relations = self.create_relations(
+                model, 'recipe', users, recipes, per_user
+            )
+            interest.update(relation.recipe_id for relation in relations)
+        now = timezone.now()
+        self.bulk_create(RecipeScore, (
+            RecipeScore(
+                recipe_id=recipe_id,
+                popular=interest[recipe_id],
+                trending=trending_score(interest[recipe_id], now),
+            )
+            for recipe_id in recipes
+        ), ignore_conflicts=True)
+        call_command('recount', stdout=self.stdout)
+        refresh_search_vectors()
+        bump_on_commit('recipe_ingredients')
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users and {len(recipes)} recipes.'
+        ))
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:36
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['search_vector'],
+    name='recipe_search_vector_idx'
+)
+
+FILL_SEARCH_VECTORS = '''
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, name), 'A')
+    || setweight(to_tsvector(%(config)s::regconfig, text), 'B')
+    || setweight(to_tsvector(%(config)s::regconfig, coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipeandingredient AS amount
+        JOIN recipes_ingredient AS ingredient
+            ON ingredient.id = amount.ingredient_id
+        WHERE amount.recipe_id = recipes_recipe.id
+    ), '')), 'C')
+'''
+
+
+def create_search_index(apps, schema_editor):
+    '''GIN indexes and tsvector exist on Postgres only.'''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(apps.get_model('recipes', 'Recipe'), SEARCH_INDEX)
+    schema_editor.execute(
+        FILL_SEARCH_VECTORS, {'config': settings.SEARCH_CONFIG}
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(
+        apps.get_model('recipes', 'Recipe'), SEARCH_INDEX
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipescore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='recipe', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
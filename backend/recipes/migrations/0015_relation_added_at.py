@@ -0,0 +1,65 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:05
+
+import math
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Ln, Power
+import django.utils.timezone
+
+
+def fill_added_at(apps, schema_editor):
+    '''
+    When older favorites and carts were added is unknown; a relation
+    is no older than its recipe, so removing one takes back at most
+    the weight it could have added.
+    '''
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for name in ('Favorites', 'ShoppingCart'):
+        apps.get_model('recipes', name).objects.update(added_at=Subquery(
+            Recipe.objects.filter(
+                id=OuterRef('recipe_id')
+            ).values('pub_date')[:1]
+        ))
+
+
+def log_trending_scores(apps, schema_editor):
+    '''Trending scores were sums of weights, now log2(1 + sum).'''
+    RecipeScore = apps.get_model('recipes', 'RecipeScore')
+    RecipeScore.objects.update(
+        trending=Ln(F('trending') + Value(1.0)) / Value(math.log(2))
+    )
+
+
+def sum_trending_scores(apps, schema_editor):
+    RecipeScore = apps.get_model('recipes', 'RecipeScore')
+    RecipeScore.objects.update(
+        trending=Power(Value(2.0), F('trending')) - Value(1.0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_author_pub_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorites',
+            name='added_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Date added'),
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='added_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Date added'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='added_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Date added'),
+        ),
+        migrations.RunPython(fill_added_at, migrations.RunPython.noop),
+        migrations.RunPython(log_trending_scores, sum_trending_scores),
+    ]
@@ -1,8 +1,27 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, models
+from django.db.models import Count, Max, Prefetch, prefetch_related_objects
+from django.utils import timezone
 from users.models import User
 
+from .cache import get_cache
+
+RECIPES_DELETED_AT = 'recipes:deleted_at'
+
+LATEST_PER_AUTHOR = '''
+{table}.id IN (SELECT id FROM (
+    SELECT numbered.id, ROW_NUMBER() OVER (
+        PARTITION BY numbered.author_id
+        ORDER BY numbered.pub_date DESC, numbered.id DESC
+    ) AS position
+    FROM {table} AS numbered
+    WHERE numbered.author_id IN ({authors})
+) AS ranked WHERE position <= %s)
+'''
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -58,6 +77,79 @@ class Ingredient(models.Model):
         verbose_name = 'Ingredient'
         verbose_name_plural = 'Ingredients'
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='ingredient_name_unit_unique'
+            ),
+        ]
+
+
+def ingredient_amounts():
+    return Prefetch(
+        'ingredients_with_amount_set',
+        queryset=RecipeAndIngredient.objects.select_related('ingredient')
+    )
+
+
+def load_recipe_relations(recipes):
+    '''
+    Load what RecipeSerializer needs for recipes that are already
+    fetched, e.g. only those missing from the card cache.
+    '''
+    prefetch_related_objects(recipes, 'author', 'tags', ingredient_amounts())
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_relations(self):
+        '''
+        Load everything RecipeSerializer needs in a fixed number of queries.
+        '''
+        return self.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related('tags', ingredient_amounts())
+
+    def latest_per_author(self, limit, authors):
+        '''
+        Keep only the latest `limit` recipes of every author. Recipes of
+        `authors`, a queryset of author ids, are numbered in one pass
+        over the (author, pub_date) index instead of a subquery per
+        recipe. Suited for prefetching bounded previews of authors.
+        '''
+        authors_sql, params = authors.query.sql_with_params()
+        # Not id__in=RawSQL(...): SQLite takes "id IN ((SELECT ...))"
+        # for a list holding the subquery's first row.
+        return self.extra(
+            where=[LATEST_PER_AUTHOR.format(
+                table=connection.ops.quote_name(Recipe._meta.db_table),
+                authors=authors_sql,
+            )],
+            params=(*params, limit),
+        )
+
+    def touch(self, content=False):
+        '''
+        Mark recipes as changed for conditional requests without
+        saving them, e.g. when favorites change. `content` marks a
+        change of what every viewer sees, e.g. of the author or tags,
+        which also expires cached recipe cards.
+        '''
+        now = timezone.now()
+        if content:
+            return self.update(updated_at=now, content_updated_at=now)
+        return self.update(updated_at=now)
+
+    def last_change(self):
+        '''
+        Count of the recipes and the time any of them last changed,
+        including deletions, for conditional requests on lists.
+        '''
+        state = self.order_by().aggregate(
+            count=Count('id'), updated_at=Max('updated_at')
+        )
+        changes = (state['updated_at'], get_cache().get(RECIPES_DELETED_AT))
+        return state['count'], max(filter(None, changes), default=None)
 
 
 class Recipe(models.Model):
@@ -78,6 +170,11 @@ class Recipe(models.Model):
         null=True,
         blank=True,
     )
+    image_variants_ready = models.BooleanField(
+        verbose_name='Image variants are ready',
+        default=False,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Description',
         help_text='Enter recipe description'
@@ -99,6 +196,15 @@ class Recipe(models.Model):
         db_index=True,
         help_text='Enter publication date',
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Update date',
+        auto_now=True,
+        db_index=True,
+    )
+    content_updated_at = models.DateTimeField(
+        verbose_name='Content update date',
+        auto_now=True,
+    )
     cooking_time = models.IntegerField(
         verbose_name='cooking time',
         blank=False,
@@ -106,12 +212,68 @@ class Recipe(models.Model):
         help_text='Enter cooking time',
         validators=[MinValueValidator(0)],
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Add to favorites, times',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.name} - {self.author}'
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            ),
+        ]
+
+
+class RecipeScore(models.Model):
+    '''
+    Precomputed popularity of a recipe, updated on every favorite and
+    shopping cart change, so ranked lists are read from an index.
+    '''
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Recipe',
+    )
+    popular = models.IntegerField(
+        verbose_name='Times added to favorites or shopping cart',
+        default=0,
+    )
+    trending = models.FloatField(
+        verbose_name='Time-decayed popularity',
+        default=0,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['popular'], name='recipe_score_popular_idx'),
+            models.Index(
+                fields=['trending'],
+                name='recipe_score_trending_idx'
+            ),
+        ]
 
 
 class RecipeAndIngredient(models.Model):
@@ -154,6 +316,12 @@ class Follow(models.Model):
         verbose_name='Author',
     )
 
+    added_at = models.DateTimeField(
+        verbose_name='Date added',
+        default=timezone.now,
+        editable=False,
+    )
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -178,6 +346,12 @@ class Favorites(models.Model):
         verbose_name='Recipe',
     )
 
+    added_at = models.DateTimeField(
+        verbose_name='Date added',
+        default=timezone.now,
+        editable=False,
+    )
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -202,6 +376,12 @@ class ShoppingCart(models.Model):
         verbose_name='Recipe',
     )
 
+    added_at = models.DateTimeField(
+        verbose_name='Date added',
+        default=timezone.now,
+        editable=False,
+    )
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
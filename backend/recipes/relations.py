@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import CharField, Value
+
+from .cache import bump_on_commit, get_version
+from .models import Favorites, Follow, Recipe, ShoppingCart
+from .scores import record_interest
+
+RELATIONS_TIMEOUT = 60 * 60
+
+RELATED = (
+    ('favorite', Favorites, 'recipe_id'),
+    ('shopping_cart', ShoppingCart, 'recipe_id'),
+    ('subscribe', Follow, 'author_id'),
+)
+
+RELATED_BY_MODEL = {
+    model: (related, field) for related, model, field in RELATED
+}
+
+DELETE_BATCH_SIZE = 500
+
+
+def relations_namespace(user_id):
+    return f'relations:{user_id}'
+
+
+def load_relations(user):
+    '''
+    Sets of favorited and carted recipe ids and followed author ids
+    of the user, loaded in one query and kept in the cache until the
+    user's relations change.
+    '''
+    cache = caches[settings.RELATIONS_CACHE]
+    namespace = relations_namespace(user.id)
+    key = f'{namespace}:{get_version(namespace, cache)}'
+    relations = cache.get(key)
+    if relations is None:
+        relations = {related: set() for related, _, _ in RELATED}
+        rows = [
+            model.objects.filter(user=user).annotate(
+                related=Value(related, output_field=CharField())
+            ).values_list(field, 'related')
+            for related, model, field in RELATED
+        ]
+        for related_id, related in rows[0].union(*rows[1:], all=True):
+            relations[related].add(related_id)
+        cache.set(key, relations, RELATIONS_TIMEOUT)
+    return relations
+
+
+def forget_relations(user_id):
+    '''Make every process reload the user's relations.'''
+    bump_on_commit(
+        relations_namespace(user_id), caches[settings.RELATIONS_CACHE]
+    )
+
+
+def relations_changed(user_id, related, added_at, delta):
+    '''
+    Side effects of adding (`delta` 1) or removing (-1) the user's
+    relations of one kind: cached relations, recipe scores and recipe
+    change times. `added_at` maps the related ids to when each relation
+    was added.
+    '''
+    forget_relations(user_id)
+    ids = list(added_at)
+    if related == 'subscribe':
+        Recipe.objects.filter(author_id__in=ids).touch()
+        return
+    record_interest(added_at, delta)
+    Recipe.objects.filter(id__in=ids).touch()
+
+
+def delete_relations(model, user_id, ids):
+    '''
+    Delete the user's relations to `ids` without loading the rows to
+    send signals for each; callers apply relations_changed() once.
+    '''
+    _, field = RELATED_BY_MODEL[model]
+    quote_name = connection.ops.quote_name
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[start:start + DELETE_BATCH_SIZE]
+            cursor.execute(
+                f'DELETE FROM {quote_name(model._meta.db_table)} '
+                f'WHERE {quote_name("user_id")} = %s '
+                f'AND {quote_name(field)} IN '
+                f'({", ".join(["%s"] * len(batch))})',
+                [user_id, *batch],
+            )
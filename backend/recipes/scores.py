@@ -0,0 +1,96 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Greatest, Ln, Power
+from django.utils import timezone as django_timezone
+
+from .models import RecipeScore
+
+TRENDING_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+# Removing a relation added long after the others can round what is
+# left of the score to nothing; keep the least part a float tells apart.
+MIN_REMAINDER = 2.0 ** -52
+
+
+def trending_time(moment=None):
+    '''Half-lives passed from the epoch to `moment`.'''
+    moment = moment or django_timezone.now()
+    return (
+        (moment - TRENDING_EPOCH).total_seconds()
+        / settings.TRENDING_HALF_LIFE.total_seconds()
+    )
+
+
+def trending_score(count, moment=None):
+    '''
+    Trending score of a recipe added `count` times at `moment`.
+    Scores are log2(1 + sum of 2 ** trending_time(event)): an event
+    weighs double one a half-life older, so ordering by the score now
+    equals ordering by exponentially decayed events, without rewriting
+    old scores. Stored as a logarithm, the score grows linearly with
+    time and never overflows.
+    '''
+    if not count:
+        return 0.0
+    time = trending_time(moment)
+    return time + math.log2(count + 2.0 ** -time)
+
+
+def log2(expression):
+    return Ln(expression) / Value(math.log(2))
+
+
+def power2(expression):
+    '''
+    2 ** expression, down to 2 ** -64: smaller powers no longer change
+    the sums they are added to, and PostgreSQL raises on underflow.
+    '''
+    return Power(Value(2.0), Greatest(expression, Value(-64.0)))
+
+
+def add_event(score, time):
+    '''log2(2 ** score + 2 ** time) without overflowing.'''
+    return Greatest(score, Value(time)) + log2(
+        Value(1.0) + power2(-Abs(score - Value(time)))
+    )
+
+
+def remove_event(score, time):
+    '''log2(2 ** score - 2 ** time) without overflowing.'''
+    return Greatest(score + log2(Greatest(
+        Value(1.0) - power2(Value(time) - score), Value(MIN_REMAINDER)
+    )), Value(0.0))
+
+
+def record_interest(added_at, delta):
+    '''
+    Count an addition (`delta` 1) or removal (-1) of each recipe to
+    favorites or shopping carts. `added_at` maps the recipe ids to when
+    each relation was added, so a removal takes back exactly the weight
+    its addition gave.
+    '''
+    change = add_event if delta > 0 else remove_event
+    ids_by_time = defaultdict(list)
+    for recipe_id, moment in added_at.items():
+        ids_by_time[trending_time(moment)].append(recipe_id)
+    trending = Case(
+        *(
+            When(recipe_id__in=ids, then=change(F('trending'), time))
+            for time, ids in ids_by_time.items()
+        ),
+        output_field=FloatField(),
+    )
+    if delta < 0:
+        trending = Case(
+            When(popular__lte=1, then=Value(0.0)),
+            default=trending,
+            output_field=FloatField(),
+        )
+    RecipeScore.objects.filter(recipe_id__in=list(added_at)).update(
+        popular=F('popular') + delta,
+        trending=trending,
+    )
@@ -0,0 +1,131 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+
+from .cache import bump_on_commit, get_version
+from .models import Recipe, RecipeAndIngredient
+
+TOKEN_RE = re.compile(r'\w+')
+
+FILL_SEARCH_VECTORS = '''
+UPDATE recipes_recipe SET search_vector =
+    setweight(to_tsvector(%s::regconfig, name), 'A')
+    || setweight(to_tsvector(%s::regconfig, text), 'B')
+    || setweight(to_tsvector(%s::regconfig, coalesce((
+        SELECT string_agg(ingredient.name, ' ')
+        FROM recipes_recipeandingredient AS amount
+        JOIN recipes_ingredient AS ingredient
+            ON ingredient.id = amount.ingredient_id
+        WHERE amount.recipe_id = recipes_recipe.id
+    ), '')), 'C')
+'''
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+class RecipeSearchIndex:
+    '''
+    Process-local inverted index over recipe names, descriptions and
+    ingredient names, used where Postgres full-text search is missing.
+    Query words match indexed words by prefix.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+
+    def _get_index(self):
+        version = get_version('recipes_search')
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._index = self._build()
+                    self._version = version
+        return self._index
+
+    @staticmethod
+    def _build():
+        postings = defaultdict(set)
+        recipes = Recipe.objects.values_list('id', 'name', 'text')
+        for recipe_id, name, text in recipes.iterator():
+            for token in tokenize(f'{name} {text}'):
+                postings[token].add(recipe_id)
+        ingredients = RecipeAndIngredient.objects.values_list(
+            'recipe_id', 'ingredient__name'
+        )
+        for recipe_id, name in ingredients.iterator():
+            for token in tokenize(name):
+                postings[token].add(recipe_id)
+        return sorted(postings), postings
+
+    def search(self, query):
+        '''Ids of recipes matching every word of the query.'''
+        vocabulary, postings = self._get_index()
+        result = None
+        for token in tokenize(query):
+            matches = set()
+            position = bisect_left(vocabulary, token)
+            while (position < len(vocabulary)
+                   and vocabulary[position].startswith(token)):
+                matches |= postings[vocabulary[position]]
+                position += 1
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result or set()
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def update_search_vector(recipe):
+    '''Refresh search data of the recipe after it or its ingredients change.'''
+    refresh_search_vectors(Recipe.objects.filter(id=recipe.id).values('id'))
+
+
+def refresh_search_vectors(recipe_ids=None):
+    '''
+    Refresh search data of recipes with `recipe_ids`, a queryset of
+    ids, or of all recipes after bulk inserts.
+    '''
+    if not uses_postgres():
+        bump_on_commit('recipes_search')
+        return
+    sql, params = FILL_SEARCH_VECTORS, [settings.SEARCH_CONFIG] * 3
+    if recipe_ids is not None:
+        ids_sql, ids_params = recipe_ids.query.sql_with_params()
+        sql = f'{sql} WHERE id IN ({ids_sql})'
+        params.extend(ids_params)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def prefix_query(query):
+    '''
+    Query matching every word of `query` by prefix, as the in-memory
+    index does. Words are stemmed first, so forms of a word match too.
+    '''
+    return SearchQuery(
+        ' & '.join(f'{token}:*' for token in tokenize(query)),
+        config=settings.SEARCH_CONFIG, search_type='raw',
+    )
+
+
+def search_recipes(queryset, query):
+    if not tokenize(query):
+        return queryset.none()
+    if uses_postgres():
+        return queryset.filter(search_vector=prefix_query(query))
+    return queryset.filter(id__in=recipe_search_index.search(query))
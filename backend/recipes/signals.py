@@ -0,0 +1,116 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+from users.models import User
+
+from .cache import bump_on_commit, get_cache
+from .models import (RECIPES_DELETED_AT, Favorites, Follow, Ingredient, Recipe,
+                     RecipeAndIngredient, RecipeScore, ShoppingCart, Tag)
+from .relations import RELATED_BY_MODEL, relations_changed
+from .search import refresh_search_vectors, update_search_vector
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients_cache(**kwargs):
+    bump_on_commit('ingredients')
+    bump_on_commit('recipes_search')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_cache(**kwargs):
+    bump_on_commit('tags')
+
+
+@receiver(post_save, sender=Recipe)
+def create_recipe_score(instance, created, **kwargs):
+    if created:
+        RecipeScore.objects.create(recipe=instance)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_recipe_search(instance, update_fields, **kwargs):
+    # Ingredients are searched too; whoever sets them refreshes again.
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_vector(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_recipes_search(instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(RecipeAndIngredient.objects.filter(
+            ingredient=instance
+        ).values('recipe_id'))
+
+
+@receiver((post_save, post_delete), sender=RecipeAndIngredient)
+def recipe_ingredients_changed(instance, **kwargs):
+    '''
+    Amounts saved one by one, e.g. in the admin. Bulk saves send no
+    signals, so their callers apply the same changes themselves.
+    '''
+    recipes = Recipe.objects.filter(id=instance.recipe_id)
+    recipes.touch(content=True)
+    refresh_search_vectors(recipes.values('id'))
+    bump_on_commit('recipe_ingredients')
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_tagged_recipes(instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Recipe.objects.filter(id=instance.id).touch(content=True)
+    elif action in ('post_add', 'post_remove'):
+        Recipe.objects.filter(id__in=pk_set).touch(content=True)
+    elif action == 'pre_clear':
+        Recipe.objects.filter(tags=instance).touch(content=True)
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_ingredients(**kwargs):
+    bump_on_commit('recipe_ingredients')
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+def relation_added(sender, instance, created, **kwargs):
+    if created:
+        related, field = RELATED_BY_MODEL[sender]
+        relations_changed(
+            instance.user_id, related,
+            {getattr(instance, field): instance.added_at}, 1
+        )
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+def relation_removed(sender, instance, **kwargs):
+    related, field = RELATED_BY_MODEL[sender]
+    relations_changed(
+        instance.user_id, related,
+        {getattr(instance, field): instance.added_at}, -1
+    )
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def touch_tag_recipes(instance, **kwargs):
+    Recipe.objects.filter(tags=instance).touch(content=True)
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def touch_ingredient_recipes(instance, **kwargs):
+    Recipe.objects.filter(ingredients=instance).touch(content=True)
+
+
+@receiver(post_save, sender=User)
+def touch_user_recipes(instance, created, update_fields, **kwargs):
+    if not created and set(update_fields or ()) != {'last_login'}:
+        Recipe.objects.filter(author=instance).touch(content=True)
+
+
+@receiver(post_delete, sender=Recipe)
+def remember_recipe_deletion(**kwargs):
+    '''Deleted recipes leave no updated_at behind to change lists.'''
+    get_cache().set(RECIPES_DELETED_AT, timezone.now(), None)
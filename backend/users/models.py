@@ -22,6 +22,18 @@ class User(AbstractUser):
         help_text='Fill last name'
     )
 
+    recipes_count = models.PositiveIntegerField(
+        'Recipes count',
+        default=0,
+        editable=False
+    )
+
+    followers_count = models.PositiveIntegerField(
+        'Followers count',
+        default=0,
+        editable=False
+    )
+
     def __str__(self):
         return self.username
 